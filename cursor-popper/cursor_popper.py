@@ -5,18 +5,239 @@ import sys
 import json
 import os
 import time
+import argparse
+import asyncio
+import gc
+import http.server
+import inspect
+import itertools
+import queue
+import socket
+import statistics
+import struct
+import threading
+import tracemalloc
+import zlib
+from collections import Counter, deque
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not available on Windows
+
+from prometheus import new_histogram, observe, render_histogram, render_metric
+from snapshots import SNAPSHOT_SCALE, decode_snapshot, encode_snapshot, quantize
+
+# Command line options
+def port_number(value):
+    port = int(value)
+    if not 1 <= port <= 65535:
+        raise argparse.ArgumentTypeError(f"{value} is not a valid port (1-65535)")
+    return port
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} must be at least 1")
+    return number
+
+parser = argparse.ArgumentParser(description="Cursor Popper")
+parser.add_argument('--record', choices=['png', 'raw'], help="record every frame to the captures folder")
+parser.add_argument('--replay', action='store_true', help="keep the last 30 seconds in memory (F9 saves them)")
+parser.add_argument('--broadcast', nargs='?', const=8765, type=port_number, metavar='PORT', help="let spectators on the network watch this game")
+parser.add_argument('--spectate', metavar='HOST[:PORT]', help="watch a game started with --broadcast")
+parser.add_argument('--metrics-port', type=port_number, metavar='PORT', help="serve Prometheus metrics on this port")
+parser.add_argument('--metrics-file', metavar='PATH', help="write Prometheus metrics to this file every few seconds")
+parser.add_argument('--soak', nargs='?', const=1000, type=positive_int, metavar='CYCLES', help="run headless for this many games and check for leaks")
+parser.add_argument('--soak-input', choices=['bot', 'random'], default='bot', help="who plays during --soak")
+options = parser.parse_args()
+
+# Soak tests run without a window or sound card
+if options.soak is not None:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
 
 # Initialize
 pygame.init()
 pygame.mixer.init()  # Initialize the mixer for audio
 screen = pygame.display.set_mode((800, 800))
 clock = pygame.time.Clock()
+target_fps = 60  # Passed to clock.tick(), 0 means unthrottled
 
 # Constants
 CENTER = (400, 400)
 ARENA_RADIUS = 350
 CURSOR_RADIUS = 5
 IMMUNITY_DURATION = 2000  # 2 seconds of immunity in milliseconds
+CAPTURE_DIR = "captures"
+CAPTURE_RING_SIZE = 8  # Frames that can wait for the encoder before we start dropping
+PNG_COMPRESSION = 3  # zlib level for captured PNGs, higher levels are much slower for little gain
+REPLAY_SECONDS = 30
+REPLAY_SAVE_COOLDOWN = 10  # Seconds before another replay can be saved
+BROADCAST_PORT = 8765
+BROADCAST_BUFFER_LIMIT = 64 * 1024  # Unsent bytes before a spectator starts skipping snapshots
+BROADCAST_STALL_TIMEOUT = 5  # Seconds a spectator may stay behind before it is disconnected
+METRICS_INTERVAL = 5  # Seconds between metrics updates
+FRAME_TIME_BUCKETS = (0.005, 0.010, 0.0167, 0.020, 0.0333, 0.050, 0.100, 0.250)  # Seconds
+RUN_DURATION_BUCKETS = (5, 10, 30, 60, 120, 300, 600)  # Seconds
+SOAK_SAMPLES = 20  # Memory/timing samples taken over a soak run
+SOAK_TRACED_CYCLES = 10  # Games at the end of a soak run that are traced with tracemalloc
+# The memory trends may grow by a fixed allowance, which covers sampling noise, plus a little per game,
+# so a long run still catches a slow leak
+SOAK_BLOCK_GROWTH_LIMIT = 5000  # Python memory blocks
+SOAK_BLOCK_GROWTH_PER_GAME = 1
+SOAK_RSS_GROWTH_LIMIT = 4 * 1024  # KB of resident memory
+SOAK_RSS_GROWTH_PER_GAME = 16
+SOAK_SURFACE_GROWTH_LIMIT = 5  # Live Surfaces
+SOAK_SURFACE_GROWTH_PER_GAME = 0.01
+SOAK_FRAME_TIME_GROWTH_LIMIT = 0.25  # Fraction the frame time trend may grow over a soak run
+SOAK_MAX_CONSECUTIVE_ERRORS = 50  # Frames in a row that may fail before a soak run gives up
+SOAK_GAME_SECONDS = (2, 40)  # The driver dodges the chaser for a random time in this range, then lets it win
+SOAK_DODGE_DISTANCE = 150  # The driver jumps away when the chaser gets this close
+
+# Metrics - the game only appends samples to deques, so nothing on the hot path takes a lock.
+# A background thread aggregates them and serves Prometheus text and/or writes it to a file
+class MetricsCollector:
+    def __init__(self, port=None, path=None):
+        self.frames = deque(maxlen=100000)
+        self.events = deque(maxlen=100000)
+        self.path = path
+        self.start_time = time.monotonic()
+        self.last_update = self.start_time
+
+        self.frame_time = new_histogram(FRAME_TIME_BUCKETS)
+        self.frame_work = new_histogram(FRAME_TIME_BUCKETS)
+        self.run_duration = new_histogram(RUN_DURATION_BUCKETS)
+        self.fps = 0.0
+        self.target_fps = 0
+        self.entities = {'bubbles': 0, 'particles': 0, 'pops': 0, 'trail_particles': 0}
+        self.sessions = {'Normal': 0, 'Hardcore': 0}
+        self.explosions = {'Normal': 0, 'Hardcore': 0}
+        self.session_start = None
+        self.audio_busy = 0
+        self.audio_channels = 0
+        self.audio_dropped = 0
+        self.errors = 0
+        self.text = self.render()
+
+        self.server = None
+        if port is not None:
+            collector = self
+
+            class MetricsHandler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = collector.text.encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            self.server = http.server.ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.stopping = threading.Event()
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def record_frame(self, frame_ms, work_ms, target_fps, bubble_count, particle_count, pop_count, trail_count):
+        self.frames.append((frame_ms, work_ms, target_fps, bubble_count, particle_count, pop_count, trail_count))
+
+    def record_event(self, name, mode=None):
+        self.events.append((name, mode, time.monotonic()))
+
+    def close(self):
+        self.stopping.set()
+        self.worker.join()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def run(self):
+        while not self.stopping.wait(METRICS_INTERVAL):
+            self.update()
+        self.update()
+
+    def update(self):
+        try:
+            now = time.monotonic()
+            frame_count = 0
+            sample = None
+            while self.frames:
+                sample = self.frames.popleft()
+                observe(self.frame_time, sample[0] / 1000)
+                observe(self.frame_work, sample[1] / 1000)
+                frame_count += 1
+            if sample:
+                self.target_fps = sample[2]
+                self.entities = dict(zip(self.entities, sample[3:]))
+            self.fps = frame_count / max(now - self.last_update, 0.001)
+            self.last_update = now
+
+            while self.events:
+                name, mode, timestamp = self.events.popleft()
+                if name == 'session':
+                    self.sessions[mode] += 1
+                    self.session_start = timestamp
+                elif name == 'explosion':
+                    self.explosions[mode] += 1
+                    if self.session_start is not None:
+                        observe(self.run_duration, timestamp - self.session_start)
+                        self.session_start = None
+                elif name == 'audio_dropped':
+                    self.audio_dropped += 1
+                elif name == 'error':
+                    self.errors += 1
+
+            if pygame.mixer.get_init():
+                self.audio_channels = pygame.mixer.get_num_channels()
+                self.audio_busy = sum(pygame.mixer.Channel(i).get_busy() for i in range(self.audio_channels))
+
+            self.text = self.render()
+            if self.path:
+                with open(self.path + ".tmp", "w") as file:
+                    file.write(self.text)
+                os.replace(self.path + ".tmp", self.path)
+        except Exception as e:
+            print(f"Failed to update metrics: {e}")
+
+    def render(self):
+        lines = []
+
+        def add_metric(name, kind, help_text, values):
+            lines.extend(render_metric(f"cursor_popper_{name}", kind, help_text, values))
+
+        def add_histogram(name, help_text, histogram):
+            lines.extend(render_histogram(f"cursor_popper_{name}", help_text, histogram))
+
+        add_histogram('frame_seconds', "Time between frames.", self.frame_time)
+        add_histogram('frame_work_seconds', "Time spent on a frame before waiting for the next tick.", self.frame_work)
+        add_metric('fps', 'gauge', "Frames per second over the last update.", [({}, round(self.fps, 2))])
+        add_metric('target_fps', 'gauge', "Frame rate the game loop asks for, 0 means unthrottled.", [({}, self.target_fps)])
+        for name, count in self.entities.items():
+            add_metric(name, 'gauge', f"Live {name.replace('_', ' ')}.", [({}, count)])
+        add_metric('sessions_total', 'counter', "Games started per mode.",
+                   [({'mode': mode}, count) for mode, count in self.sessions.items()])
+        add_metric('explosions_total', 'counter', "Games ended by an explosion per mode.",
+                   [({'mode': mode}, count) for mode, count in self.explosions.items()])
+        add_histogram('run_duration_seconds', "How long a game lasted before exploding.", self.run_duration)
+        add_metric('audio_channels', 'gauge', "Mixer channels available.", [({}, self.audio_channels)])
+        add_metric('audio_channels_busy', 'gauge', "Mixer channels playing a sound.", [({}, self.audio_busy)])
+        add_metric('audio_dropped_total', 'counter', "Sounds not played because every channel was busy.", [({}, self.audio_dropped)])
+        add_metric('errors_total', 'counter', "Errors written to the error log.", [({}, self.errors)])
+        add_metric('uptime_seconds', 'gauge', "Seconds since the game started.", [({}, round(time.monotonic() - self.start_time, 1))])
+        return "\n".join(lines) + "\n"
+
+# Metrics (off unless --metrics-port or --metrics-file is given)
+metrics = None
+if options.metrics_port is not None or options.metrics_file is not None:
+    try:
+        metrics = MetricsCollector(options.metrics_port, options.metrics_file)
+    except Exception as e:
+        print(f"Error starting metrics: {e}")
 
 # Audio setup
 try:
@@ -34,10 +255,13 @@ except Exception as e:
 def play_sound(sound, volume=1.0):
     if not audio_muted:
         sound.set_volume(volume)
-        sound.play()
+        if sound.play() is None and metrics:
+            metrics.record_event('audio_dropped')
 
 # Error handling - creates a log file for errors
 def log_error(error_message):
+    if metrics:
+        metrics.record_event('error')
     try:
         with open("game_error_log.txt", "a") as log_file:
             log_file.write(f"{pygame.time.get_ticks()}: {error_message}\n")
@@ -109,6 +333,584 @@ class ScoreManager:
 
 # Create score manager
 score_manager = ScoreManager()
+if options.soak is not None:
+    score_manager.scores_file = os.devnull  # Don't let the soak test overwrite real best scores
+
+# Frame capture - copies each finished frame into a ring of preallocated buffers
+# and lets a background thread encode it, so recording never stalls the game
+class FrameRecorder:
+    def __init__(self, surface, record_format=None, replay=False):
+        self.surface = surface
+        self.size = surface.get_size()
+        self.masks = surface.get_masks()
+        self.bitsize = surface.get_bitsize()
+        self.record_format = record_format
+        self.replay = deque(maxlen=REPLAY_SECONDS * 60) if replay else None
+        self.frame_number = 0
+        self.dropped_frames = 0
+
+        frame_size = surface.get_pitch() * surface.get_height()
+        self.slots = [bytearray(frame_size) for _ in range(CAPTURE_RING_SIZE)]
+        self.free_slots = queue.Queue()
+        self.filled_slots = queue.Queue()
+        for index in range(CAPTURE_RING_SIZE):
+            self.free_slots.put(index)
+
+        self.session_name = time.strftime("%Y%m%d-%H%M%S")
+        self.raw_file = None
+        self.raw_frame = None
+        self.raw_frame_number = 0
+        if record_format:
+            os.makedirs(os.path.join(CAPTURE_DIR, self.session_name), exist_ok=True)
+            if record_format == 'raw':
+                self.raw_file = open(os.path.join(CAPTURE_DIR, self.session_name, "frames.rgb"), "wb")
+
+        self.replay_writer = None
+        self.last_replay_request = None
+        self.worker = threading.Thread(target=self.run_encoder, daemon=True)
+        self.worker.start()
+
+    def capture(self):
+        # Called right after pygame.display.flip() - only a single memory copy happens here
+        self.frame_number += 1
+        try:
+            index = self.free_slots.get_nowait()
+        except queue.Empty:
+            # Encoder fell behind, drop this frame rather than wait
+            self.dropped_frames += 1
+            return
+        self.slots[index][:] = self.surface.get_buffer()
+        self.filled_slots.put((index, self.frame_number))
+
+    def save_replay(self):
+        # The encoder thread owns the replay buffer, so just ask it to save.
+        # Repeated requests (e.g. an error every frame) are ignored during the cooldown
+        if self.replay is None:
+            return
+        now = time.monotonic()
+        if self.last_replay_request is not None and now - self.last_replay_request < REPLAY_SAVE_COOLDOWN:
+            return
+        self.last_replay_request = now
+        self.filled_slots.put(('replay', 0))
+
+    def close(self):
+        self.filled_slots.put(None)
+        self.worker.join()
+        if self.replay_writer:
+            self.replay_writer.join()
+        if self.raw_file:
+            self.raw_file.close()
+        if self.dropped_frames:
+            print(f"Frame capture dropped {self.dropped_frames} of {self.frame_number} frames")
+
+    def make_surface(self, frame):
+        surface = pygame.Surface(self.size, 0, self.bitsize, self.masks)
+        surface.get_buffer().write(bytes(frame))
+        return surface
+
+    def save_png(self, frame, path):
+        # pygame.image.save holds the GIL for the whole encode (~30 ms a frame), which stalls the
+        # game thread. Only the RGB conversion needs the GIL here, zlib compresses without it
+        width, height = self.size
+        rgb = pygame.image.tobytes(self.make_surface(frame), 'RGB')
+        stride = width * 3
+        rows = b''.join(b'\x00' + rgb[y * stride:(y + 1) * stride] for y in range(height))
+        with open(path, "wb") as file:
+            file.write(b'\x89PNG\r\n\x1a\n')
+            for kind, data in ((b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+                               (b'IDAT', zlib.compress(rows, PNG_COMPRESSION)),
+                               (b'IEND', b'')):
+                file.write(struct.pack('>I', len(data)) + kind)
+                file.write(data)
+                file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def repeat_raw_frame(self, until):
+        # Dropped frames are filled with the previous frame, so the file still plays back at 60 fps
+        if self.raw_frame is not None:
+            for _ in range(until - self.raw_frame_number):
+                self.raw_file.write(self.raw_frame)
+        self.raw_frame_number = until
+
+    def write_raw(self, rgb, frame_number):
+        self.repeat_raw_frame(frame_number - 1)
+        self.raw_file.write(rgb)
+        self.raw_frame = rgb
+        self.raw_frame_number = frame_number
+
+    def run_encoder(self):
+        while True:
+            item = self.filled_slots.get()
+            if item is None:
+                # The game has stopped capturing, so frame_number no longer changes
+                if self.raw_file:
+                    self.repeat_raw_frame(self.frame_number)
+                break
+            index, frame_number = item
+            if index == 'replay':
+                # Only one replay is written at a time
+                if self.replay and not (self.replay_writer and self.replay_writer.is_alive()):
+                    self.replay_writer = threading.Thread(target=self.write_replay, args=(list(self.replay),), daemon=True)
+                    self.replay_writer.start()
+                continue
+
+            frame = self.slots[index]
+            try:
+                if self.replay is not None:
+                    # Compress quickly so 30 seconds of frames fit in memory
+                    self.replay.append((frame_number, zlib.compress(frame, 1)))
+                if self.raw_file:
+                    self.write_raw(pygame.image.tobytes(self.make_surface(frame), 'RGB'), frame_number)
+                elif self.record_format:
+                    self.save_png(frame, os.path.join(CAPTURE_DIR, self.session_name, f"frame_{frame_number:06d}.png"))
+            except Exception as e:
+                log_error(f"Failed to encode frame {frame_number}: {e}")
+            finally:
+                self.free_slots.put(index)
+
+    def write_replay(self, frames):
+        last_frame = frames[-1][0]
+        replay_dir = os.path.join(CAPTURE_DIR, f"replay-{time.strftime('%Y%m%d-%H%M%S')}-{last_frame:06d}")
+        try:
+            os.makedirs(replay_dir, exist_ok=True)
+            for frame_number, data in frames:
+                self.save_png(zlib.decompress(data), os.path.join(replay_dir, f"frame_{frame_number:06d}.png"))
+            print(f"Saved {len(frames)} replay frames to {replay_dir}")
+        except Exception as e:
+            log_error(f"Failed to save replay: {e}")
+
+# Broadcast server - runs an asyncio loop in its own thread. The game loop only
+# hands over a snapshot each frame, encoding and sending happen on the server thread
+class BroadcastServer:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.clients = {}  # writer -> {'tick', 'snapshot', 'stalled_since'}
+        self.tick = 0
+        self.error = None
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error:
+            raise self.error
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self.handle_client, self.host, self.port))
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+
+    def publish(self, snapshot):
+        # Called from the game loop - only schedules the work
+        self.loop.call_soon_threadsafe(self.send_snapshot, snapshot)
+
+    def close(self):
+        try:
+            asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result(timeout=2)
+        except Exception as e:
+            log_error(f"Error stopping broadcast server: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    async def shutdown(self):
+        self.server.close()
+        for writer in list(self.clients):
+            writer.close()
+        self.clients.clear()
+
+    async def handle_client(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.clients[writer] = {'tick': None, 'snapshot': None, 'stalled_since': None}
+        try:
+            # Spectators never send anything, we only wait for them to leave
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def send_snapshot(self, snapshot):
+        self.tick += 1
+        encoded = {}  # Spectators that are in sync share one encoded delta
+        for writer, client in list(self.clients.items()):
+            if writer.transport.get_write_buffer_size() > BROADCAST_BUFFER_LIMIT:
+                # Slow spectator - skip snapshots until it catches up, the next delta covers the gap
+                now = time.monotonic()
+                if client['stalled_since'] is None:
+                    client['stalled_since'] = now
+                elif now - client['stalled_since'] > BROADCAST_STALL_TIMEOUT:
+                    self.clients.pop(writer, None)
+                    writer.close()
+                continue
+            client['stalled_since'] = None
+
+            message = encoded.get(client['tick'])
+            if message is None:
+                message = encode_snapshot(self.tick, snapshot, client['snapshot'])
+                encoded[client['tick']] = message
+            writer.write(message)
+            client['tick'] = self.tick
+            client['snapshot'] = snapshot
+
+# Soak test - plays thousands of games as fast as possible and watches memory and frame time.
+# The dummy video driver has no mouse and the game reads its timers from pygame.time.get_ticks(),
+# so the driver takes over both: the mouse follows its input and every frame advances the clock
+# by exactly 1/60 s, so timers behave like a real game even though frames aren't throttled.
+# Each game the driver dodges the chaser for a random time so bubbles get to expire, golden bubbles
+# spawn and Hardcore games end on a missed bubble, then walks into the chaser.
+# tracemalloc makes frames many times slower, so it only runs for the last few games to find
+# allocation sites, and the memory and frame time trends come from the untraced games
+class SoakDriver:
+    def __init__(self, cycles, input_mode):
+        self.cycles = cycles
+        self.input_mode = input_mode
+        self.sample_every = max(1, cycles // SOAK_SAMPLES)
+        self.trace_from = cycles - min(SOAK_TRACED_CYCLES, max(1, cycles // 4))
+        self.completed_cycles = 0
+        self.frame = 0
+        self.mouse_pos = CENTER
+        self.was_exploded = False
+        self.was_playing = False
+        self.restart_at = 0
+        self.game_start = 0
+        self.lose_at = 0
+        self.pop_chance = 0.0
+        self.bubble_spawns = {}
+        self.expired_bubbles = 0
+        self.golden_bubbles = 0
+        self.hardcore_misses = 0
+        self.caught_early = 0
+        self.game_frames = 0
+        self.longest_game = 0
+        self.done = False
+        self.aborted = False
+        self.recoveries = 0
+        self.consecutive_errors = 0
+        self.longest_error_run = 0
+        self.frame_times = []
+        self.last_frame_end = None
+        self.peaks = {'bubbles': 0, 'particles': 0, 'pops': 0, 'trail_particles': 0, 'chaser_speed': 0}
+        self.samples = []
+        self.first_objects = None
+        self.last_objects = None
+        self.start_time = time.monotonic()
+        self.error_log_size = os.path.getsize("game_error_log.txt") if os.path.exists("game_error_log.txt") else 0
+
+        pygame.time.get_ticks = self.get_ticks
+        pygame.mouse.get_pos = self.get_pos
+        pygame.mouse.set_pos = self.set_pos
+
+    def get_ticks(self):
+        return self.frame * 1000 // 60
+
+    def get_pos(self):
+        return self.mouse_pos
+
+    def set_pos(self, pos):
+        self.mouse_pos = (int(pos[0]), int(pos[1]))
+
+    def click(self, pos):
+        self.set_pos(pos)
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=self.mouse_pos))
+
+    def press(self, key):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode='', scancode=0))
+
+    def next_frame(self, failed=False):
+        # Called once per frame from end_frame(), or with failed=True after the game recovered
+        # from an error, and queues the input for the next frame
+        now = time.perf_counter()
+        if failed:
+            self.recoveries += 1
+            self.consecutive_errors += 1
+            self.longest_error_run = max(self.longest_error_run, self.consecutive_errors)
+            if self.consecutive_errors >= SOAK_MAX_CONSECUTIVE_ERRORS:
+                self.aborted = True
+                self.done = True
+        else:
+            self.consecutive_errors = 0
+            if self.last_frame_end is not None:
+                self.frame_times.append(now - self.last_frame_end)
+
+        # Bubbles that were there last frame and are now past their lifespan expired, rather than
+        # being popped or cleared by an explosion. Bubbles with new ids have just spawned
+        current_time = self.get_ticks()
+        spawns = {}
+        for bubble in bubbles:
+            spawns[bubble['id']] = bubble['spawn_time']
+            if bubble['golden'] and bubble['id'] not in self.bubble_spawns:
+                self.golden_bubbles += 1
+        expired = 0
+        for bubble_id, spawn_time in self.bubble_spawns.items():
+            if bubble_id not in spawns and current_time - spawn_time > BUBBLE_LIFESPAN:
+                expired += 1
+        self.expired_bubbles += expired
+        self.bubble_spawns = spawns
+        self.frame += 1
+
+        # Entity counts drop back to zero when a game ends, keep the highest seen since the last sample
+        peaks = self.peaks
+        peaks['bubbles'] = max(peaks['bubbles'], len(bubbles))
+        peaks['particles'] = max(peaks['particles'], len(particles))
+        peaks['pops'] = max(peaks['pops'], len(pops))
+        peaks['trail_particles'] = max(peaks['trail_particles'], len(trail_particles))
+        peaks['chaser_speed'] = max(peaks['chaser_speed'], chaser['speed'])
+
+        playing = started and not exploded
+        if playing and not self.was_playing:
+            self.game_start = self.frame
+            self.lose_at = self.frame + random.randint(SOAK_GAME_SECONDS[0] * 60, SOAK_GAME_SECONDS[1] * 60)
+            self.pop_chance = random.uniform(0, 0.03)  # Some games leave most bubbles to expire
+        self.was_playing = playing
+
+        if exploded and not self.was_exploded:
+            if mode == 'Hardcore' and expired:
+                self.hardcore_misses += 1
+            elif self.frame < self.lose_at:
+                self.caught_early += 1
+            self.game_frames += self.frame - self.game_start
+            self.longest_game = max(self.longest_game, self.frame - self.game_start)
+            self.completed_cycles += 1
+            self.restart_at = self.frame + random.randint(10, 90)  # Let the explosion play out a bit
+            if self.completed_cycles % self.sample_every == 0 or self.completed_cycles == self.cycles:
+                self.take_sample()
+            if self.completed_cycles == self.trace_from:
+                tracemalloc.start()
+        self.was_exploded = exploded
+
+        if self.done:
+            pass
+        elif self.completed_cycles >= self.cycles and exploded:
+            self.done = True
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+        else:
+            self.drive_input()
+        self.last_frame_end = time.perf_counter()
+
+    def drive_input(self):
+        if choosing_mode:
+            self.click(random.choice((normal_button_rect, hardcore_button_rect)).center)
+        elif paused:
+            if random.random() < 0.05:
+                self.click(CENTER)
+        elif exploded:
+            if self.frame == self.restart_at - 1 and random.random() < 0.3:
+                self.click(mode_button_rect.center)
+            elif self.frame >= self.restart_at:
+                if random.random() < 0.5:
+                    self.press(pygame.K_SPACE)
+                else:
+                    self.click(CENTER)
+                self.set_pos((random.randint(100, 700), random.randint(100, 700)))
+        elif self.frame >= self.lose_at:
+            # This game has lasted long enough, let the chaser win
+            self.set_pos((chaser['x'], chaser['y']))
+        else:
+            if self.input_mode == 'random':
+                x = min(799, max(0, self.mouse_pos[0] + random.randint(-15, 15)))
+                y = min(799, max(0, self.mouse_pos[1] + random.randint(-15, 15)))
+                self.set_pos((x, y))
+                if random.random() < 0.002:
+                    self.press(pygame.K_ESCAPE)
+                elif random.random() < 0.001:
+                    self.press(pygame.K_m)
+                elif random.random() < 0.01:
+                    self.click(self.mouse_pos)
+            if bubbles and random.random() < self.pop_chance:
+                bubble = random.choice(bubbles)
+                # The game reads the click position on the next frame, so only go for bubbles
+                # the chaser can't reach by then
+                if math.hypot(bubble['x'] - chaser['x'], bubble['y'] - chaser['y']) > SOAK_DODGE_DISTANCE:
+                    self.click((bubble['x'], bubble['y']))
+                    return
+            if math.hypot(self.mouse_pos[0] - chaser['x'], self.mouse_pos[1] - chaser['y']) <= SOAK_DODGE_DISTANCE:
+                # Jump to the far side of the arena
+                angle = math.atan2(CENTER[1] - chaser['y'], CENTER[0] - chaser['x']) + random.uniform(-0.5, 0.5)
+                distance = random.uniform(0.5, 1.0) * (ARENA_RADIUS - CURSOR_RADIUS)
+                self.set_pos((CENTER[0] + math.cos(angle) * distance, CENTER[1] + math.sin(angle) * distance))
+
+    def take_sample(self):
+        gc.collect()
+        # The driver's own bookkeeping grows with every sample, leave it out of the counts
+        own_objects = {id(self.samples), id(self.frame_times), id(self.peaks), id(self.first_objects), id(self.last_objects)}
+        own_objects.update(id(sample) for sample in self.samples)
+        object_counts = {}
+        pending = []
+        for obj in gc.get_objects():
+            if id(obj) not in own_objects:
+                type_name = type(obj).__name__
+                object_counts[type_name] = object_counts.get(type_name, 0) + 1
+                pending.append(obj)
+        # Surfaces and Fonts aren't tracked by gc, so find them through the containers holding them.
+        # A dict or tuple holding only untracked objects is untracked too, so look inside those as well
+        surfaces = set()
+        fonts = set()
+        checked = set()
+        while pending:
+            for ref in gc.get_referents(pending.pop()):
+                if isinstance(ref, pygame.Surface):
+                    surfaces.add(id(ref))
+                elif isinstance(ref, pygame.font.Font):
+                    fonts.add(id(ref))
+                elif isinstance(ref, (dict, tuple)) and not gc.is_tracked(ref) and id(ref) not in checked:
+                    checked.add(id(ref))
+                    pending.append(ref)
+        self.samples.append({
+            'cycle': self.completed_cycles,
+            'frame': self.frame,
+            'traced': tracemalloc.is_tracing(),
+            'blocks': sys.getallocatedblocks(),
+            'rss': self.read_rss(),
+            'objects': sum(object_counts.values()),
+            'surfaces': len(surfaces),
+            'fonts': len(fonts),
+            'frame_ms': statistics.median(self.frame_times) * 1000 if self.frame_times else 0.0,
+            **self.peaks,
+        })
+        self.frame_times = []
+        self.peaks = dict.fromkeys(self.peaks, 0)
+        if self.first_objects is None:
+            self.first_objects = object_counts
+        self.last_objects = object_counts
+        # Sampling is slow, don't count it as frame time
+        self.last_frame_end = None
+
+    def read_rss(self):
+        # Resident memory in KB. Unlike the block count this includes Surfaces, Fonts and sounds
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        if resource is None:
+            return 0
+        # Peak rather than current memory, but a leak still shows up as growth. macOS reports bytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+
+    def trend(self, key):
+        # Growth over the run according to a least squares line through the untraced samples,
+        # and the number of games it covers. The first sample is skipped, it includes start-up work
+        samples = [sample for sample in self.samples[1:] if not sample['traced']]
+        if len(samples) < 2:
+            return 0.0, 0.0, 0
+        cycles = [sample['cycle'] for sample in samples]
+        values = [sample[key] for sample in samples]
+        mean_cycle = statistics.mean(cycles)
+        mean_value = statistics.mean(values)
+        spread = sum((c - mean_cycle) ** 2 for c in cycles)
+        slope = sum((c - mean_cycle) * (v - mean_value) for c, v in zip(cycles, values)) / spread
+        start = mean_value + slope * (cycles[0] - mean_cycle)
+        games = cycles[-1] - cycles[0]
+        return start, slope * games, games
+
+    def finish(self, path="soak_report.txt"):
+        # Writes the report and returns the exit code
+        snapshot = None
+        if tracemalloc.is_tracing():
+            gc.collect()
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            tracemalloc.stop()
+
+        memory_start, memory_growth, games = self.trend('blocks')
+        frame_start, frame_growth, _ = self.trend('frame_ms')
+        rss_start, rss_growth, _ = self.trend('rss')
+        surface_start, surface_growth, _ = self.trend('surfaces')
+        memory_limit = SOAK_BLOCK_GROWTH_LIMIT + SOAK_BLOCK_GROWTH_PER_GAME * games
+        rss_limit = SOAK_RSS_GROWTH_LIMIT + SOAK_RSS_GROWTH_PER_GAME * games
+        surface_limit = SOAK_SURFACE_GROWTH_LIMIT + SOAK_SURFACE_GROWTH_PER_GAME * games
+        memory_ok = memory_growth <= memory_limit
+        rss_ok = rss_growth <= rss_limit
+        surfaces_ok = surface_growth <= surface_limit
+        per_game = max(1, games)
+        frame_ok = frame_start <= 0 or frame_growth / frame_start <= SOAK_FRAME_TIME_GROWTH_LIMIT
+
+        errors = []
+        if os.path.exists("game_error_log.txt"):
+            with open("game_error_log.txt", "r") as log_file:
+                log_file.seek(self.error_log_size)
+                errors = log_file.read().splitlines()
+
+        lines = [
+            f"Soak test: {self.completed_cycles} games, {self.frame} frames, {self.input_mode} input, "
+            f"{time.monotonic() - self.start_time:.0f} seconds",
+            f"Memory trend: {memory_start:.0f} blocks, {memory_growth:+.0f} blocks over {games} games, "
+            f"{memory_growth / per_game:+.1f} per game (limit {memory_limit:.0f}) - {'OK' if memory_ok else 'FAIL'}",
+            f"Resident memory trend: {rss_start / 1024:.1f} MB, {rss_growth / 1024:+.1f} MB over {games} games, "
+            f"{rss_growth / per_game:+.1f} KB per game (limit {rss_limit / 1024:.1f} MB) - {'OK' if rss_ok else 'FAIL'}",
+            f"Surface trend: {surface_start:.0f} Surfaces, {surface_growth:+.0f} over {games} games, "
+            f"{surface_growth / per_game:+.2f} per game (limit {surface_limit:.1f}) - {'OK' if surfaces_ok else 'FAIL'}",
+            f"Frame time trend: {frame_start:.3f} ms, {frame_growth:+.3f} ms over {games} games "
+            f"(limit {SOAK_FRAME_TIME_GROWTH_LIMIT:.0%}) - {'OK' if frame_ok else 'FAIL'}",
+            f"Errors logged: {len(errors)}, recovered from {self.recoveries} "
+            f"(longest run {self.longest_error_run} frames, limit {SOAK_MAX_CONSECUTIVE_ERRORS}) - "
+            f"{'FAIL, stopped early' if self.aborted else 'OK'}",
+            f"Games lasted {self.game_frames / max(1, self.completed_cycles) / 60:.1f} seconds on average, "
+            f"{self.longest_game / 60:.1f} at most, {self.caught_early} were caught before the driver gave up",
+        ]
+        for name, count in (("Bubbles expired", self.expired_bubbles), ("Golden bubbles", self.golden_bubbles),
+                            ("Hardcore games lost to a missed bubble", self.hardcore_misses)):
+            lines.append(f"{name}: {count}" + ("" if count else " - never reached"))
+        for message, count in Counter(error.split(": ", 1)[-1] for error in errors).most_common(10):
+            lines.append(f"  {count} x {message}")
+
+        lines.append("")
+        lines.append("Entity counts and chaser speed are the highest seen since the previous sample.")
+        lines.append(f"{'game':>6} {'frame':>9} {'blocks':>8} {'rss MB':>7} {'objects':>8} {'surfaces':>8} "
+                     f"{'fonts':>5} {'frame ms':>9} {'bubbles':>8} {'particles':>10} {'pops':>6} {'trail':>6} {'speed':>6}")
+        for sample in self.samples:
+            lines.append(f"{sample['cycle']:>6} {sample['frame']:>9} {sample['blocks']:>8} {sample['rss'] / 1024:>7.1f} "
+                         f"{sample['objects']:>8} {sample['surfaces']:>8} {sample['fonts']:>5} "
+                         f"{sample['frame_ms']:>9.3f} {sample['bubbles']:>8} {sample['particles']:>10} "
+                         f"{sample['pops']:>6} {sample['trail_particles']:>6} {sample['chaser_speed']:>6.1f}"
+                         + (" (traced)" if sample['traced'] else ""))
+
+        if snapshot:
+            lines.append("")
+            lines.append(f"Allocations made since game {self.trace_from} that are still alive:")
+            # Skip the samples and counts kept by the driver itself
+            driver_source, driver_start = inspect.getsourcelines(SoakDriver)
+            driver_lines = range(driver_start, driver_start + len(driver_source))
+            stats = [stat for stat in snapshot.statistics('lineno')
+                     if stat.traceback[0].filename != __file__ or stat.traceback[0].lineno not in driver_lines]
+            for stat in stats[:10]:
+                frame = stat.traceback[0]
+                lines.append(f"  {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KB, {stat.count} blocks")
+
+        if self.first_objects and self.last_objects:
+            lines.append("")
+            lines.append(f"Object types that grew since game {self.samples[0]['cycle']}:")
+            grown = Counter(self.last_objects)
+            grown.subtract(self.first_objects)
+            for type_name, count in grown.most_common(10):
+                if count <= 0:
+                    break
+                lines.append(f"  {type_name}: {self.first_objects.get(type_name, 0)} -> {self.last_objects[type_name]}")
+
+        passed = memory_ok and rss_ok and surfaces_ok and frame_ok and not self.aborted
+        lines.append("")
+        lines.append("Result: " + ("PASS" if passed else "FAIL"))
+        report = "\n".join(lines) + "\n"
+        print(report)
+        try:
+            with open(path, "w") as file:
+                file.write(report)
+        except Exception as e:
+            log_error(f"Failed to write soak report: {e}")
+        return 0 if passed else 1
 
 # Chaser ball
 chaser = {
@@ -137,6 +939,7 @@ last_spawn = 0
 BUBBLE_LIFESPAN = 5000  # 5 seconds
 bubble_spawn_count = 0
 next_golden_spawn = random.randint(15, 25)
+bubble_ids = itertools.count()
 
 # Score
 font = pygame.font.SysFont(None, 48)
@@ -156,6 +959,27 @@ trail_particles = []
 # AI control
 auto_control = False
 
+# Spectator broadcast (off unless --broadcast is given)
+broadcast_server = None
+if options.broadcast is not None:
+    try:
+        broadcast_server = BroadcastServer('0.0.0.0', options.broadcast)
+        print(f"Broadcasting to spectators on port {options.broadcast}")
+    except Exception as e:
+        log_error(f"Failed to start broadcast server: {e}")
+        print(f"Error starting broadcast server: {e}")
+
+# Soak test (off unless --soak is given)
+soak_driver = None
+if options.soak is not None:
+    soak_driver = SoakDriver(options.soak, options.soak_input)
+    target_fps = 0  # Soak tests run as fast as possible
+
+# Frame capture (off unless --record or --replay is given)
+frame_recorder = None
+if options.record or options.replay:
+    frame_recorder = FrameRecorder(screen, options.record, options.replay)
+
 def reset_game():
     global chaser, particles, exploded, bubbles, last_spawn, pops, bubble_spawn_count, next_golden_spawn
     try:
@@ -180,6 +1004,198 @@ def reset_game():
     except Exception as e:
         log_error(f"Error in reset_game: {e}")
 
+# Snapshot of everything a spectator needs to draw the current frame
+def make_snapshot(cursor):
+    flags = 0
+    for bit, value in enumerate((started, exploded, paused, choosing_mode, mode == 'Hardcore',
+                                 pygame.time.get_ticks() < chaser['immunity_end'])):
+        if value:
+            flags |= 1 << bit
+    header = (
+        flags,
+        score_manager.get_current_score(mode),
+        score_manager.get_best_score(mode),
+        quantize(chaser['x']),
+        quantize(chaser['y']),
+        quantize(cursor[0]),
+        quantize(cursor[1]),
+    )
+    snapshot_bubbles = {}
+    for bubble in bubbles:
+        radius = bubble['radius'] | 0x80 if bubble['golden'] else bubble['radius']
+        snapshot_bubbles[bubble['id']] = (quantize(bubble['x']), quantize(bubble['y']), radius)
+    return header, snapshot_bubbles
+
+# Show the finished frame and hand it to recording and spectators
+def end_frame(cursor):
+    pygame.display.flip()
+    if frame_recorder:
+        frame_recorder.capture()
+    if broadcast_server and broadcast_server.clients:
+        broadcast_server.publish(make_snapshot(cursor))
+    if soak_driver:
+        soak_driver.next_frame()
+    clock.tick(target_fps)
+    if metrics:
+        metrics.record_frame(clock.get_time(), clock.get_rawtime(), target_fps, len(bubbles), len(particles), len(pops), len(trail_particles))
+
+# Stop the background services and pygame - used by every exit path
+def shutdown():
+    if frame_recorder:
+        frame_recorder.close()
+    if broadcast_server:
+        broadcast_server.close()
+    if metrics:
+        metrics.close()
+    pygame.quit()
+
+# Spectator mode - draws the game from a broadcast stream instead of playing
+def connect_spectator(address):
+    host, _, port = address.partition(':')
+    try:
+        connection = socket.create_connection((host or 'localhost', int(port or BROADCAST_PORT)), timeout=5)
+        connection.setblocking(False)
+        return connection
+    except Exception as e:
+        log_error(f"Failed to connect to {address}: {e}")
+        print(f"Could not connect to {address}: {e}")
+        return None
+
+def run_spectator(address):
+    connection = connect_spectator(address)
+    if connection is None:
+        return
+
+    pygame.display.set_caption(f"Cursor Popper - spectating {address}")
+    received = bytearray()
+    snapshot = None
+    connected = True
+    was_exploded = False
+    explosion = []
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                if connection:
+                    connection.close()
+                return
+
+        # Read everything that arrived since the last frame
+        while connected:
+            try:
+                data = connection.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b''
+            if not data:
+                connected = False
+                break
+            received += data
+
+        while len(received) >= 2:
+            length = struct.unpack_from('<H', received)[0]
+            if len(received) < 2 + length:
+                break
+            try:
+                _, snapshot = decode_snapshot(bytes(received[2:2 + length]), snapshot)
+            except Exception as e:
+                # Later deltas would build on a wrong state, so reconnect to get a fresh keyframe
+                log_error(f"Bad snapshot from {address}, reconnecting: {e}")
+                connection.close()
+                received.clear()
+                snapshot = None
+                connection = connect_spectator(address)
+                connected = connection is not None
+                break
+            del received[:2 + length]
+
+        screen.fill((30, 30, 30))
+        pygame.draw.circle(screen, (50, 50, 50), CENTER, ARENA_RADIUS)
+
+        if snapshot is None:
+            text = font.render("Waiting for the game..." if connected else "Connection lost", True, (255, 255, 255))
+            screen.blit(text, (400 - text.get_width() // 2, 400 - text.get_height() // 2))
+        else:
+            header, snapshot_bubbles = snapshot
+            flags, current_score, best_score, chaser_x, chaser_y, cursor_x, cursor_y = header
+            is_started, is_exploded, is_paused, is_choosing, is_hardcore, is_immune = ((flags >> bit) & 1 for bit in range(6))
+            chaser_pos = (chaser_x // SNAPSHOT_SCALE, chaser_y // SNAPSHOT_SCALE)
+
+            # Explosion particles are simulated locally, only the explosion itself is sent
+            if is_exploded and not was_exploded:
+                explosion = []
+                for _ in range(300):
+                    angle = random.uniform(0, 2 * math.pi)
+                    speed = random.uniform(2, 5)
+                    explosion.append({
+                        'x': chaser_pos[0],
+                        'y': chaser_pos[1],
+                        'vx': math.cos(angle) * speed,
+                        'vy': math.sin(angle) * speed,
+                        'radius': random.randint(2, 4),
+                        'color': (random.randint(150, 255), random.randint(50, 255), random.randint(50, 255))
+                    })
+            elif not is_exploded:
+                explosion = []
+            was_exploded = is_exploded
+
+            for x, y, radius in snapshot_bubbles.values():
+                color = (255, 215, 0) if radius & 0x80 else (0, 200, 255)
+                pygame.draw.circle(screen, color, (x // SNAPSHOT_SCALE, y // SNAPSHOT_SCALE), radius & 0x7F, 2)
+
+            if is_started and not is_exploded:
+                if is_immune and (pygame.time.get_ticks() // 200) % 2 == 0:
+                    chaser_color = (255, 200, 200)
+                else:
+                    chaser_color = (255, 50, 50)
+                pygame.draw.circle(screen, chaser_color, chaser_pos, 30)
+
+            for p in explosion:
+                pygame.draw.circle(screen, p['color'], (int(p['x']), int(p['y'])), p['radius'])
+                p['x'] += p['vx']
+                p['y'] += p['vy']
+                p['vx'] *= 0.995
+                p['vy'] *= 0.995
+                dx = p['x'] - CENTER[0]
+                dy = p['y'] - CENTER[1]
+                if math.hypot(dx, dy) > ARENA_RADIUS - p['radius']:
+                    angle = math.atan2(dy, dx)
+                    p['x'] = CENTER[0] + math.cos(angle) * (ARENA_RADIUS - p['radius'])
+                    p['y'] = CENTER[1] + math.sin(angle) * (ARENA_RADIUS - p['radius'])
+                    p['vx'] *= -0.5
+                    p['vy'] *= -0.5
+
+            if is_choosing:
+                text = font.render("Player is choosing a mode", True, (255, 255, 255))
+                screen.blit(text, (400 - text.get_width() // 2, 400 - text.get_height() // 2))
+            else:
+                pygame.draw.circle(screen, (255, 255, 255), (cursor_x // SNAPSHOT_SCALE, cursor_y // SNAPSHOT_SCALE), CURSOR_RADIUS)
+
+                spectated_mode = 'Hardcore' if is_hardcore else 'Normal'
+                score_text = font.render(f"Score: {current_score}", True, (255, 255, 255))
+                best_text = font.render(f"Best: {best_score}", True, (255, 255, 0))
+                mode_score_text = small_font.render(f"{spectated_mode} Mode", True, (200, 200, 200))
+                screen.blit(score_text, (30, 30))
+                screen.blit(best_text, (800 - best_text.get_width() - 30, 30))
+                screen.blit(mode_score_text, (400 - mode_score_text.get_width() // 2, 30))
+
+            if is_paused:
+                text = font.render("PAUSED", True, (255, 255, 255))
+                screen.blit(text, (400 - text.get_width() // 2, 400 - text.get_height() // 2))
+
+            status = "SPECTATING" if connected else "SPECTATING - connection lost"
+            status_text = tiny_font.render(status, True, (200, 200, 200))
+            screen.blit(status_text, (20, 760))
+
+        pygame.display.flip()
+        clock.tick(60)
+
+if options.spectate:
+    run_spectator(options.spectate)
+    shutdown()
+    sys.exit()
+
 # Game loop
 running = True
 while running:
@@ -230,11 +1246,15 @@ while running:
                         choosing_mode = False
                         started = True
                         reset_game()
+                        if metrics:
+                            metrics.record_event('session', mode)
                     elif hardcore_button_rect.collidepoint(mx, my):
                         mode = 'Hardcore'
                         choosing_mode = False
                         started = True
                         reset_game()
+                        if metrics:
+                            metrics.record_event('session', mode)
                 else:
                     if exploded:
                         dx = mx - CENTER[0]
@@ -242,6 +1262,8 @@ while running:
                         if math.hypot(dx, dy) <= ARENA_RADIUS:
                             reset_game()
                             started = True
+                            if metrics:
+                                metrics.record_event('session', mode)
 
                     if started and not exploded:
                         for bubble in bubbles[:]:
@@ -276,10 +1298,12 @@ while running:
                 if event.key == pygame.K_SPACE and exploded:
                     reset_game()
                     started = True
+                    if metrics:
+                        metrics.record_event('session', mode)
 
                 if event.key == pygame.K_ESCAPE:
                     if exploded:
-                        pygame.quit()
+                        shutdown()
                         sys.exit()
                     elif started:
                         if not paused:
@@ -292,6 +1316,10 @@ while running:
                     if not audio_muted:
                         play_sound(bubble_pop_sound, 0.3)
 
+                # Save the instant replay with F9
+                if event.key == pygame.K_F9 and frame_recorder:
+                    frame_recorder.save_replay()
+
         if choosing_mode:
             title = font.render("Choose a Mode", True, (255, 255, 255))
             screen.blit(title, (400 - title.get_width() // 2, 250))
@@ -313,8 +1341,7 @@ while running:
             mute_button_rect.height = max(mute_button_rect.height, mute_text.get_height() + 10)
 
 
-            pygame.display.flip()
-            clock.tick(60)
+            end_frame(pygame.mouse.get_pos())
             continue
 
         if paused:
@@ -391,8 +1418,7 @@ while running:
             mute_text = tiny_font.render("Sound: " + ("OFF" if audio_muted else "ON"), True, (255, 255, 255))
             screen.blit(mute_text, (mute_button_rect.centerx - mute_text.get_width() // 2, mute_button_rect.centery - mute_text.get_height() // 2))
 
-            pygame.display.flip()
-            clock.tick(60)
+            end_frame(pygame.mouse.get_pos())
             continue
 
         # Mouse position (real or AI)
@@ -444,7 +1470,8 @@ while running:
                 'radius': random.randint(8, 12) if is_golden else random.randint(10, 25),
                 'spawn_time': current_time,
                 'golden': is_golden,
-                'last_bounce_time': 0  # To prevent multiple bounce sounds in a short period
+                'last_bounce_time': 0,  # To prevent multiple bounce sounds in a short period
+                'id': next(bubble_ids)  # Lets spectators follow a bubble between snapshots
             })
             last_spawn = current_time
 
@@ -503,6 +1530,8 @@ while running:
             # Cursor collision (only if not immune)
             if not is_immune and math.hypot(chaser['x'] - mx, chaser['y'] - my) < 20:
                 exploded = True
+                if metrics:
+                    metrics.record_event('explosion', mode)
                 # Pop all bubbles visually when exploding
                 for bubble in bubbles:
                     for _ in range(10):
@@ -586,6 +1615,8 @@ while running:
                     is_immune = current_time < chaser['immunity_end']
                     if not is_immune:
                         exploded = True
+                        if metrics:
+                            metrics.record_event('explosion', mode)
                         # Pop all bubbles visually when exploding
                         for bubble in bubbles:
                             for _ in range(10):
@@ -728,18 +1759,27 @@ while running:
             pygame.draw.circle(surface, (*p['color'], alpha), (p['size'], p['size']), p['size'])
             screen.blit(surface, (p['x'] - p['size'], p['y'] - p['size']))
 
-        pygame.display.flip()
-        clock.tick(60)
+        end_frame((mx, my))
 
     except Exception as e:
         log_error(f"Critical game error: {e}")
         print(f"An error occurred: {e}")
+        # Keep the frames leading up to the error for the bug report
+        if frame_recorder:
+            frame_recorder.save_replay()
         # Try to recover
         try:
             reset_game()
         except:
             pass
+        # Soak runs carry on with the next frame, unless the game keeps failing
+        if soak_driver:
+            soak_driver.next_frame(failed=True)
+            if soak_driver.aborted:
+                running = False
 
 # Save scores before exiting
 score_manager.save_scores()
-pygame.quit()
\ No newline at end of file
+shutdown()
+if soak_driver:
+    sys.exit(soak_driver.finish())
\ No newline at end of file
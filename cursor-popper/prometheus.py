@@ -0,0 +1,40 @@
+# Prometheus text format (version 0.0.4) for the metrics exporter.
+# A histogram is a dict of upper bounds ("le") and one count per bucket plus a
+# final +Inf bucket. Counts are stored per bucket and made cumulative on render
+def new_histogram(buckets):
+    return {'buckets': tuple(buckets), 'counts': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+
+def observe(histogram, value):
+    # A value equal to a bound belongs to that bucket, values above every bound go to +Inf
+    index = 0
+    while index < len(histogram['buckets']) and value > histogram['buckets'][index]:
+        index += 1
+    histogram['counts'][index] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def render_metric(name, kind, help_text, samples):
+    # samples is a list of (labels, value) pairs
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    return lines
+
+def render_histogram(name, help_text, histogram):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    total = 0
+    for bound, count in zip(histogram['buckets'] + ('+Inf',), histogram['counts']):
+        total += count
+        lines.append(f"{name}_bucket{format_labels({'le': bound})} {total}")
+    lines.append(f"{name}_sum {round(histogram['sum'], 6)}")
+    lines.append(f"{name}_count {histogram['count']}")
+    return lines
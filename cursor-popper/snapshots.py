@@ -0,0 +1,100 @@
+import struct
+
+# Spectator snapshots - positions are quantized to quarter pixels and each
+# snapshot is sent as a delta against the last one the spectator received.
+# A snapshot is (header, bubbles) where header holds the HEADER_FIELDS values
+# and bubbles maps bubble id -> (x, y, radius), with the golden flag in the top radius bit
+SNAPSHOT_SCALE = 4
+HEADER_FIELDS = 'BIIHHHH'  # flags, score, best score, chaser x, chaser y, cursor x, cursor y
+MESSAGE_HEADER = struct.Struct('<HBI')  # length, message type, tick
+BUBBLE_RECORD = struct.Struct('<IHHB')  # id, x, y, radius
+BUBBLE_MOVE = struct.Struct('<Ibb')  # id, dx, dy
+KEYFRAME = 0
+DELTA = 1
+
+def quantize(value):
+    return max(0, min(65535, int(value * SNAPSHOT_SCALE)))
+
+def encode_snapshot(tick, snapshot, previous=None):
+    header, bubbles = snapshot
+    if previous is None:
+        body = struct.pack('<' + HEADER_FIELDS, *header)
+        body += struct.pack('<B', len(bubbles))
+        for bubble_id, (x, y, radius) in bubbles.items():
+            body += BUBBLE_RECORD.pack(bubble_id, x, y, radius)
+        message_type = KEYFRAME
+    else:
+        previous_header, previous_bubbles = previous
+        changed = [i for i in range(len(header)) if header[i] != previous_header[i]]
+        mask = 0
+        for i in changed:
+            mask |= 1 << i
+        body = struct.pack('<B', mask)
+        body += struct.pack('<' + ''.join(HEADER_FIELDS[i] for i in changed), *(header[i] for i in changed))
+
+        removed = [bubble_id for bubble_id in previous_bubbles if bubble_id not in bubbles]
+        added = []
+        moved = []
+        for bubble_id, bubble in bubbles.items():
+            old = previous_bubbles.get(bubble_id)
+            if old == bubble:
+                continue
+            if old is not None and old[2] == bubble[2]:
+                dx = bubble[0] - old[0]
+                dy = bubble[1] - old[1]
+                if -128 <= dx <= 127 and -128 <= dy <= 127:
+                    moved.append(BUBBLE_MOVE.pack(bubble_id, dx, dy))
+                    continue
+            added.append(BUBBLE_RECORD.pack(bubble_id, *bubble))
+
+        body += struct.pack('<B', len(removed))
+        body += b''.join(struct.pack('<I', bubble_id) for bubble_id in removed)
+        body += struct.pack('<B', len(added)) + b''.join(added)
+        body += struct.pack('<B', len(moved)) + b''.join(moved)
+        message_type = DELTA
+    return MESSAGE_HEADER.pack(MESSAGE_HEADER.size - 2 + len(body), message_type, tick) + body
+
+def decode_snapshot(message, previous=None):
+    # message is everything after the length field
+    message_type, tick = struct.unpack_from('<BI', message)
+    offset = 5
+    if message_type == KEYFRAME:
+        header_format = '<' + HEADER_FIELDS
+        header = struct.unpack_from(header_format, message, offset)
+        offset += struct.calcsize(header_format)
+        bubbles = {}
+    elif previous is None:
+        raise ValueError("delta snapshot received before a keyframe")
+    else:
+        header = list(previous[0])
+        bubbles = dict(previous[1])
+        mask = message[offset]
+        offset += 1
+        for i in range(len(HEADER_FIELDS)):
+            if mask & (1 << i):
+                header[i] = struct.unpack_from('<' + HEADER_FIELDS[i], message, offset)[0]
+                offset += struct.calcsize(HEADER_FIELDS[i])
+        header = tuple(header)
+
+        removed_count = message[offset]
+        offset += 1
+        for _ in range(removed_count):
+            bubbles.pop(struct.unpack_from('<I', message, offset)[0], None)
+            offset += 4
+
+    added_count = message[offset]
+    offset += 1
+    for _ in range(added_count):
+        bubble_id, x, y, radius = BUBBLE_RECORD.unpack_from(message, offset)
+        bubbles[bubble_id] = (x, y, radius)
+        offset += BUBBLE_RECORD.size
+
+    if message_type == DELTA:
+        moved_count = message[offset]
+        offset += 1
+        for _ in range(moved_count):
+            bubble_id, dx, dy = BUBBLE_MOVE.unpack_from(message, offset)
+            x, y, radius = bubbles[bubble_id]
+            bubbles[bubble_id] = (x + dx, y + dy, radius)
+            offset += BUBBLE_MOVE.size
+    return tick, (header, bubbles)
@@ -0,0 +1,48 @@
+from prometheus import format_labels, new_histogram, observe, render_histogram, render_metric
+
+
+def test_value_on_a_bound_goes_in_that_bucket():
+    histogram = new_histogram((0.5, 1, 2))
+    for value in (0.5, 0.75, 1, 2, 2.5, 0):
+        observe(histogram, value)
+    assert histogram['counts'] == [2, 2, 1, 1]
+    assert histogram['count'] == 6
+    assert histogram['sum'] == 6.75
+
+
+def test_histogram_is_cumulative_with_inf_sum_and_count():
+    histogram = new_histogram((1, 5))
+    for value in (1, 3, 3, 10):
+        observe(histogram, value)
+    assert render_histogram('run_seconds', "Run length.", histogram) == [
+        '# HELP run_seconds Run length.',
+        '# TYPE run_seconds histogram',
+        'run_seconds_bucket{le="1"} 1',
+        'run_seconds_bucket{le="5"} 3',
+        'run_seconds_bucket{le="+Inf"} 4',
+        'run_seconds_sum 17.0',
+        'run_seconds_count 4',
+    ]
+
+
+def test_empty_histogram():
+    lines = render_histogram('frame_seconds', "Frame time.", new_histogram((0.01,)))
+    assert lines[2:] == ['frame_seconds_bucket{le="0.01"} 0', 'frame_seconds_bucket{le="+Inf"} 0',
+                         'frame_seconds_sum 0.0', 'frame_seconds_count 0']
+
+
+def test_label_formatting():
+    assert format_labels({}) == ''
+    assert format_labels(None) == ''
+    assert format_labels({'mode': 'Normal'}) == '{mode="Normal"}'
+    assert format_labels({'mode': 'Hardcore', 'le': 0.5}) == '{mode="Hardcore",le="0.5"}'
+    assert format_labels({'path': 'a\\b "c"\nd'}) == '{path="a\\\\b \\"c\\"\\nd"}'
+
+
+def test_metric_lines():
+    assert render_metric('sessions_total', 'counter', "Games started.", [({'mode': 'Normal'}, 3), ({}, 1)]) == [
+        '# HELP sessions_total Games started.',
+        '# TYPE sessions_total counter',
+        'sessions_total{mode="Normal"} 3',
+        'sessions_total 1',
+    ]
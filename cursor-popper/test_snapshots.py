@@ -0,0 +1,79 @@
+import random
+import struct
+
+import pytest
+
+from snapshots import decode_snapshot, encode_snapshot, quantize
+
+
+def make_snapshot(score=0, chaser=(400, 400), bubbles=None):
+    header = (1, score, 50, quantize(chaser[0]), quantize(chaser[1]), quantize(300), quantize(300))
+    return header, dict(bubbles or {})
+
+
+def roundtrip(tick, snapshot, previous=None, decoded_previous=None):
+    message = encode_snapshot(tick, snapshot, previous)
+    assert struct.unpack_from('<H', message)[0] == len(message) - 2
+    return decode_snapshot(message[2:], decoded_previous)
+
+
+def test_keyframe_roundtrip():
+    snapshot = make_snapshot(12, bubbles={3: (400, 800, 20), 7: (1200, 1600, 10 | 0x80)})
+    tick, decoded = roundtrip(5, snapshot)
+    assert tick == 5
+    assert decoded == snapshot
+
+
+def test_delta_only_sends_changes():
+    first = make_snapshot(bubbles={1: (400, 400, 20)})
+    second = make_snapshot(bubbles={1: (401, 399, 20)})
+    keyframe = encode_snapshot(1, first)
+    delta = encode_snapshot(2, second, first)
+    assert len(delta) < len(keyframe)
+    _, decoded = roundtrip(2, second, first, decode_snapshot(keyframe[2:])[1])
+    assert decoded == second
+
+
+def test_delta_handles_added_removed_and_far_moves():
+    first = make_snapshot(bubbles={1: (400, 400, 20), 2: (800, 800, 12)})
+    second = make_snapshot(score=3, chaser=(500, 420), bubbles={1: (3000, 400, 20), 3: (100, 100, 9 | 0x80)})
+    _, decoded = roundtrip(2, second, first, first)
+    assert decoded == second
+
+
+def test_delta_without_keyframe_is_rejected():
+    first = make_snapshot()
+    message = encode_snapshot(2, make_snapshot(score=1), first)
+    with pytest.raises(ValueError):
+        decode_snapshot(message[2:])
+
+
+def test_quantize_clamps_to_16_bits():
+    assert quantize(-5) == 0
+    assert quantize(100000) == 65535
+    assert quantize(10.3) == 41
+
+
+def test_random_roundtrip():
+    rng = random.Random(1)
+    bubbles = {}
+    previous = decoded_previous = None
+    for tick in range(2000):
+        if rng.random() < 0.05:
+            bubbles[tick] = [rng.uniform(50, 750), rng.uniform(50, 750), rng.randint(8, 25) | (0x80 if rng.random() < 0.1 else 0)]
+        for bubble_id in list(bubbles):
+            if rng.random() < 0.02:
+                del bubbles[bubble_id]
+                continue
+            bubbles[bubble_id][0] += rng.uniform(-1, 1) + (100 if rng.random() < 0.01 else 0)
+            bubbles[bubble_id][1] += rng.uniform(-1, 1)
+        snapshot = (
+            (rng.randint(0, 63), tick // 10, 50, quantize(400 + tick % 50), quantize(400), quantize(tick % 800), quantize(300)),
+            {bubble_id: (quantize(x), quantize(y), radius) for bubble_id, (x, y, radius) in bubbles.items()},
+        )
+        decoded_tick, decoded = roundtrip(tick, snapshot, previous, decoded_previous)
+        assert decoded_tick == tick
+        assert tuple(decoded[0]) == snapshot[0]
+        assert decoded[1] == snapshot[1]
+        previous, decoded_previous = snapshot, decoded
+